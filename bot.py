@@ -5,18 +5,29 @@ from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 from aiogram.types import BotCommand
 
+try:
+    import uvloop
+except ImportError:  # optional, not available on Windows
+    uvloop = None
+
 from config import BOT_TOKEN
-from database import init_db
+from database import init_db, close_db
 from handlers import pills, schedule, confirm
 from scheduler import setup_scheduler
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
 logger = logging.getLogger(__name__)
 
 
+def setup_logging():
+    """Configure logging; keep per-update aiogram and aiosqlite chatter out of INFO."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+    logging.getLogger("aiosqlite").setLevel(logging.WARNING)
+
+
 async def set_bot_commands(bot: Bot):
     """Set bot commands for the menu."""
     commands = [
@@ -34,6 +45,13 @@ async def set_bot_commands(bot: Bot):
 
 
 async def main():
+    setup_logging()
+
+    # Python 3.12+: run new tasks eagerly until their first real suspension
+    eager_task_factory = getattr(asyncio, "eager_task_factory", None)
+    if eager_task_factory is not None:
+        asyncio.get_running_loop().set_task_factory(eager_task_factory)
+
     await init_db()
     logger.info("Database initialized")
 
@@ -55,8 +73,15 @@ async def main():
     logger.info("Scheduler started")
 
     logger.info("Starting bot...")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        scheduler.shutdown(wait=False)
+        await close_db()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -11,3 +11,5 @@ TIMEZONE = os.getenv("TIMEZONE", "Europe/Moscow")
 EVENING_REMINDER_TIME = os.getenv("EVENING_REMINDER_TIME", "20:00")
 
 DB_PATH = "pills_bot.db"
+# Read-only SQLite connections kept open for concurrent queries
+DB_READERS = int(os.getenv("DB_READERS", "4"))
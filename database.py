@@ -1,90 +1,334 @@
+import asyncio
+import time
 import aiosqlite
-import json
-from datetime import datetime, date
-from typing import Optional
-from config import DB_PATH
-from models import User, Pill, Schedule, IntakeLog
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, date, timezone
+from itertools import product
+from typing import Optional, Sequence
+from zoneinfo import ZoneInfo
+from config import DB_PATH, DB_READERS, TIMEZONE
+from models import User, Pill, Schedule, IntakeLog, TickContext, days_to_mask
+
+# Shared long-lived connection, opened once in init_db() and reused everywhere
+_db: Optional[aiosqlite.Connection] = None
+# Serializes write transactions so one caller's commit or rollback can't end another's
+_write_lock = asyncio.Lock()
+# Read-only connections for SELECTs; under WAL they read while _db writes
+_readers: Optional[asyncio.Queue] = None
+
+
+class _RowCache:
+    """Bounded LRU of rows with a TTL, refusing fills that raced with a write.
+
+    Readers take generation() before their SELECT and pass it to put(); any
+    invalidate() in between bumps the generation, so a row read before the
+    write committed is never stored after the writer dropped the old entry.
+    """
 
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries: OrderedDict = OrderedDict()
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._generation = 0
 
-async def init_db():
-    """Initialize database and create tables if not exist."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER NOT NULL,
-                chat_id INTEGER NOT NULL,
-                username TEXT,
-                first_name TEXT,
-                timezone TEXT DEFAULT 'Europe/Moscow',
-                UNIQUE(telegram_id, chat_id)
-            )
-        """)
+    def generation(self) -> int:
+        return self._generation
 
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS pills (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                dosage TEXT NOT NULL,
-                photo_id TEXT,
-                notes TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-            )
-        """)
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value, generation: Optional[int] = None):
+        """Store value; with generation, only if no write invalidated since it was taken."""
+        if generation is not None and generation != self._generation:
+            return
+        self._entries[key] = (value, time.monotonic() + self._ttl)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        self._generation += 1
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
 
+
+# Users and pills looked up on every event; the write helpers below invalidate
+# them, and the TTL bounds staleness if something else ever writes the file
+_user_cache = _RowCache(maxsize=1024, ttl=300)
+_pill_cache = _RowCache(maxsize=1024, ttl=300)
+
+# Same zone the scheduler stamps intake logs in, so "today" means the same day everywhere
+TZ = ZoneInfo(TIMEZONE)
+
+# Bump together with a new `if version < N` block in init_db()
+SCHEMA_VERSION = 6
+
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER on older builds
+_MAX_SQL_PARAMS = 999
+
+
+async def init_db():
+    """Open the shared connection and reader pool, and create tables if not exist."""
+    global _db, _readers
+    _db = await aiosqlite.connect(DB_PATH)
+    _db.row_factory = aiosqlite.Row
+    db = _db
+
+    # WAL lets readers run alongside the writer, NORMAL sync skips the fsync per commit
+    await db.execute("PRAGMA journal_mode=WAL")
+    await db.execute("PRAGMA synchronous=NORMAL")
+    await db.execute("PRAGMA temp_store=MEMORY")
+    await db.execute("PRAGMA cache_size=-64000")
+    await db.execute("PRAGMA mmap_size=268435456")
+    await db.execute("PRAGMA foreign_keys=ON")
+    await db.execute("PRAGMA busy_timeout=5000")
+
+    # All DDL and migrations go through one transaction, committed once at the end
+    await db.execute("BEGIN IMMEDIATE")
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER NOT NULL,
+            chat_id INTEGER NOT NULL,
+            username TEXT,
+            first_name TEXT,
+            timezone TEXT DEFAULT 'Europe/Moscow',
+            UNIQUE(telegram_id, chat_id)
+        )
+    """)
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS pills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            dosage TEXT NOT NULL,
+            photo_id TEXT,
+            notes TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    """)
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS schedules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pill_id INTEGER NOT NULL,
+            time TEXT NOT NULL,
+            days_mask INTEGER NOT NULL DEFAULT 0,
+            frequency TEXT DEFAULT 'daily',
+            interval_days INTEGER DEFAULT 1,
+            start_date TEXT,
+            is_active BOOLEAN DEFAULT 1,
+            FOREIGN KEY (pill_id) REFERENCES pills (id) ON DELETE CASCADE
+        )
+    """)
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS intake_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            schedule_id INTEGER NOT NULL,
+            scheduled_time INTEGER NOT NULL,
+            taken_at INTEGER,
+            status TEXT DEFAULT 'pending',
+            reminder_count INTEGER DEFAULT 0,
+            last_reminder_at INTEGER,
+            telegram_id INTEGER,
+            chat_id INTEGER,
+            FOREIGN KEY (schedule_id) REFERENCES schedules (id) ON DELETE CASCADE
+        )
+    """)
+
+    # Schema migrations, applied once per version
+    cursor = await db.execute("PRAGMA user_version")
+    version = (await cursor.fetchone())[0]
+
+    if version < 1:
+        await _add_column(db, "schedules", "frequency", "TEXT DEFAULT 'daily'")
+        await _add_column(db, "schedules", "interval_days", "INTEGER DEFAULT 1")
+        await _add_column(db, "schedules", "start_date", "TEXT")
+    if version < 2:
+        await _add_column(db, "intake_logs", "reminder_count", "INTEGER DEFAULT 0")
+        await _add_column(db, "intake_logs", "last_reminder_at", "DATETIME")
+    if version < 3:
+        await _add_column(db, "schedules", "days_mask", "INTEGER NOT NULL DEFAULT 0")
+    if version < 4 and await _column_exists(db, "schedules", "days"):
+        # Backfill the bitmask from the legacy JSON days list (bit N set = day N)
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS schedules (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pill_id INTEGER NOT NULL,
-                time TEXT NOT NULL,
-                days TEXT NOT NULL,
-                frequency TEXT DEFAULT 'daily',
-                interval_days INTEGER DEFAULT 1,
-                start_date TEXT,
-                is_active BOOLEAN DEFAULT 1,
-                FOREIGN KEY (pill_id) REFERENCES pills (id) ON DELETE CASCADE
+            UPDATE schedules SET days_mask = (
+                SELECT COALESCE(SUM(DISTINCT 1 << value), 0) FROM json_each(schedules.days)
             )
         """)
-
-        # Add new columns if they don't exist (migration)
-        try:
-            await db.execute("ALTER TABLE schedules ADD COLUMN frequency TEXT DEFAULT 'daily'")
-        except:
-            pass
-        try:
-            await db.execute("ALTER TABLE schedules ADD COLUMN interval_days INTEGER DEFAULT 1")
-        except:
-            pass
-        try:
-            await db.execute("ALTER TABLE schedules ADD COLUMN start_date TEXT")
-        except:
-            pass
-
+        await db.execute("ALTER TABLE schedules DROP COLUMN days")
+    if version < 5:
+        # ISO datetime strings -> unix epoch seconds
+        for column in ("scheduled_time", "taken_at", "last_reminder_at"):
+            await db.execute(f"""
+                UPDATE intake_logs SET {column} = CAST(strftime('%s', {column}) AS INTEGER)
+                WHERE typeof({column}) = 'text'
+            """)
+    if version < 6:
+        # Owner copied onto each log so ownership and per-chat lookups skip the joins
+        await _add_column(db, "intake_logs", "telegram_id", "INTEGER")
+        await _add_column(db, "intake_logs", "chat_id", "INTEGER")
         await db.execute("""
-            CREATE TABLE IF NOT EXISTS intake_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                schedule_id INTEGER NOT NULL,
-                scheduled_time DATETIME NOT NULL,
-                taken_at DATETIME,
-                status TEXT DEFAULT 'pending',
-                reminder_count INTEGER DEFAULT 0,
-                last_reminder_at DATETIME,
-                FOREIGN KEY (schedule_id) REFERENCES schedules (id) ON DELETE CASCADE
+            UPDATE intake_logs SET (telegram_id, chat_id) = (
+                SELECT u.telegram_id, u.chat_id
+                FROM schedules s
+                JOIN pills p ON s.pill_id = p.id
+                JOIN users u ON p.user_id = u.id
+                WHERE s.id = intake_logs.schedule_id
             )
+            WHERE telegram_id IS NULL
         """)
 
-        # Add new columns if they don't exist (migration for intake_logs)
-        try:
-            await db.execute("ALTER TABLE intake_logs ADD COLUMN reminder_count INTEGER DEFAULT 0")
-        except:
-            pass
+    # Indexes for the hot lookup predicates (users(telegram_id, chat_id) is covered by UNIQUE)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_users_chat ON users(chat_id)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_pills_user ON pills(user_id)")
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sched_pill ON schedules(pill_id) WHERE is_active = 1"
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sched_time ON schedules(time) WHERE is_active = 1"
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_logs_sched_date ON intake_logs(schedule_id, scheduled_time)"
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_logs_status_time ON intake_logs(status, scheduled_time)"
+    )
+
+    if version < SCHEMA_VERSION:
+        await db.execute("ANALYZE")
+        await db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    await db.commit()
+
+    # Opened after the commit so mode=ro finds the file and the final schema
+    _readers = asyncio.Queue()
+    for _ in range(DB_READERS):
+        _readers.put_nowait(await _open_reader())
+
+
+async def _open_reader() -> aiosqlite.Connection:
+    """Open a read-only connection to the database file."""
+    conn = await aiosqlite.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    conn.row_factory = aiosqlite.Row
+    await conn.execute("PRAGMA temp_store=MEMORY")
+    await conn.execute("PRAGMA cache_size=-16000")
+    await conn.execute("PRAGMA mmap_size=268435456")
+    await conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+async def _column_exists(db: aiosqlite.Connection, table: str, column: str) -> bool:
+    """Check whether a table has the given column."""
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    return any(row["name"] == column for row in await cursor.fetchall())
+
+
+async def _add_column(db: aiosqlite.Connection, table: str, column: str, definition: str):
+    """Add a column to a table unless it already exists."""
+    if not await _column_exists(db, table, column):
+        await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+async def close_db():
+    """Close the reader pool and the shared connection."""
+    global _db, _readers
+    if _readers is not None:
+        while not _readers.empty():
+            await _readers.get_nowait().close()
+        _readers = None
+    _user_cache.clear()
+    _pill_cache.clear()
+    if _db is not None:
+        await _db.close()
+        _db = None
+
+
+@asynccontextmanager
+async def _transaction():
+    """Yield the shared connection, committing on success and rolling back on error."""
+    async with _write_lock:
         try:
-            await db.execute("ALTER TABLE intake_logs ADD COLUMN last_reminder_at DATETIME")
-        except:
-            pass
-
-        await db.commit()
+            yield _db
+            # Inside the try: a failed commit must not leave the shared connection mid-transaction
+            await _db.commit()
+        except BaseException:
+            await _db.rollback()
+            raise
+
+
+@asynccontextmanager
+async def _reader():
+    """Borrow a read-only connection from the pool for the duration of a query."""
+    conn = await _readers.get()
+    try:
+        yield conn
+    finally:
+        _readers.put_nowait(conn)
+
+
+# Row factories: build models straight from the row tuple, columns in field order
+_USER_COLUMNS = "id, telegram_id, chat_id, username, first_name, timezone"
+_PILL_COLUMNS = "id, user_id, name, dosage, photo_id, notes"
+_SCHEDULE_COLUMNS = "id, pill_id, time, days_mask, frequency, interval_days, start_date, is_active"
+_INTAKE_LOG_COLUMNS = "id, schedule_id, scheduled_time, taken_at, status"
+
+# Per-event lookups, formatted once; sqlite3's statement cache then reuses the prepared plan
+_GET_USER_SQL = f"SELECT {_USER_COLUMNS} FROM users WHERE telegram_id = ? AND chat_id = ?"
+_GET_PILL_SQL = f"SELECT {_PILL_COLUMNS} FROM pills WHERE id = ?"
+_GET_INTAKE_LOG_SQL = f"SELECT {_INTAKE_LOG_COLUMNS} FROM intake_logs WHERE id = ?"
+
+
+def _user_factory(cursor, row) -> User:
+    """Build a User from a row selected with _USER_COLUMNS."""
+    return User(*row)
+
+
+def _pill_factory(cursor, row) -> Pill:
+    """Build a Pill from a row selected with _PILL_COLUMNS."""
+    return Pill(*row)
+
+
+def _schedule_factory(cursor, row) -> Schedule:
+    """Build a Schedule from a row selected with _SCHEDULE_COLUMNS."""
+    schedule_id, pill_id, time_str, days_mask, frequency, interval_days, start_date, is_active = row
+    return Schedule(
+        schedule_id,
+        pill_id,
+        time_str,
+        Schedule.days_from_mask(days_mask),
+        frequency or "daily",
+        interval_days or 1,
+        start_date,
+        bool(is_active),
+    )
+
+
+def _intake_log_factory(cursor, row) -> IntakeLog:
+    """Build an IntakeLog from a row selected with _INTAKE_LOG_COLUMNS."""
+    log_id, schedule_id, scheduled_time, taken_at, status = row
+    return IntakeLog(
+        log_id,
+        schedule_id,
+        datetime.fromtimestamp(scheduled_time, timezone.utc),
+        datetime.fromtimestamp(taken_at, timezone.utc) if taken_at else None,
+        status,
+    )
 
 
 # User operations
@@ -94,64 +338,49 @@ async def get_or_create_user(
     username: Optional[str],
     first_name: Optional[str],
 ) -> User:
-    """Get existing user or create new one."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            "SELECT * FROM users WHERE telegram_id = ? AND chat_id = ?",
-            (telegram_id, chat_id),
-        )
-        row = await cursor.fetchone()
-
-        if row:
-            return User(
-                id=row["id"],
-                telegram_id=row["telegram_id"],
-                chat_id=row["chat_id"],
-                username=row["username"],
-                first_name=row["first_name"],
-                timezone=row["timezone"],
-            )
+    """Get existing user or create new one, refreshing username and first name."""
+    # Returning users with unchanged names stay on the read-only path
+    user = await get_user(telegram_id, chat_id)
+    if user and user.username == username and user.first_name == first_name:
+        return user
 
+    async with _transaction() as db:
         cursor = await db.execute(
-            """INSERT INTO users (telegram_id, chat_id, username, first_name)
-               VALUES (?, ?, ?, ?)""",
+            f"""INSERT INTO users (telegram_id, chat_id, username, first_name)
+               VALUES (?, ?, ?, ?)
+               ON CONFLICT (telegram_id, chat_id) DO UPDATE
+               SET username = excluded.username, first_name = excluded.first_name
+               RETURNING {_USER_COLUMNS}""",
             (telegram_id, chat_id, username, first_name),
         )
-        await db.commit()
-
-        return User(
-            id=cursor.lastrowid,
-            telegram_id=telegram_id,
-            chat_id=chat_id,
-            username=username,
-            first_name=first_name,
-        )
+        cursor.row_factory = _user_factory
+        user = await cursor.fetchone()
+    _user_cache.invalidate((telegram_id, chat_id))
+    _user_cache.put((telegram_id, chat_id), user)
+    return user
 
 
 async def get_user(telegram_id: int, chat_id: int) -> Optional[User]:
     """Get user by telegram_id and chat_id."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            "SELECT * FROM users WHERE telegram_id = ? AND chat_id = ?",
-            (telegram_id, chat_id),
-        )
-        row = await cursor.fetchone()
+    user = _user_cache.get((telegram_id, chat_id))
+    if user is not None:
+        return user
 
-        if row:
-            return User(
-                id=row["id"],
-                telegram_id=row["telegram_id"],
-                chat_id=row["chat_id"],
-                username=row["username"],
-                first_name=row["first_name"],
-                timezone=row["timezone"],
-            )
-        return None
+    generation = _user_cache.generation()
+    async with _reader() as db:
+        cursor = await db.execute(_GET_USER_SQL, (telegram_id, chat_id))
+        cursor.row_factory = _user_factory
+        user = await cursor.fetchone()
+    if user is not None:
+        _user_cache.put((telegram_id, chat_id), user, generation)
+    return user
 
 
 # Pill operations
+_INSERT_PILL_SQL = """INSERT INTO pills (user_id, name, dosage, photo_id, notes)
+   VALUES (?, ?, ?, ?, ?)"""
+
+
 async def add_pill(
     user_id: int,
     name: str,
@@ -160,71 +389,83 @@ async def add_pill(
     notes: Optional[str] = None,
 ) -> Pill:
     """Add a new pill."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute(
-            """INSERT INTO pills (user_id, name, dosage, photo_id, notes)
-               VALUES (?, ?, ?, ?, ?)""",
-            (user_id, name, dosage, photo_id, notes),
-        )
-        await db.commit()
-
-        return Pill(
-            id=cursor.lastrowid,
-            user_id=user_id,
-            name=name,
-            dosage=dosage,
-            photo_id=photo_id,
-            notes=notes,
-        )
+    async with _transaction() as db:
+        cursor = await db.execute(_INSERT_PILL_SQL, (user_id, name, dosage, photo_id, notes))
+
+    return Pill(
+        id=cursor.lastrowid,
+        user_id=user_id,
+        name=name,
+        dosage=dosage,
+        photo_id=photo_id,
+        notes=notes,
+    )
 
 
 async def get_user_pills(user_id: int) -> list[Pill]:
     """Get all pills for a user."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _reader() as db:
         cursor = await db.execute(
-            "SELECT * FROM pills WHERE user_id = ?", (user_id,)
+            f"SELECT {_PILL_COLUMNS} FROM pills WHERE user_id = ?", (user_id,)
         )
-        rows = await cursor.fetchall()
-
-        return [
-            Pill(
-                id=row["id"],
-                user_id=row["user_id"],
-                name=row["name"],
-                dosage=row["dosage"],
-                photo_id=row["photo_id"],
-                notes=row["notes"],
-            )
-            for row in rows
-        ]
+        cursor.row_factory = _pill_factory
+        return await cursor.fetchall()
 
 
 async def get_pill(pill_id: int) -> Optional[Pill]:
     """Get pill by id."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM pills WHERE id = ?", (pill_id,))
-        row = await cursor.fetchone()
+    pill = _pill_cache.get(pill_id)
+    if pill is not None:
+        return pill
 
-        if row:
-            return Pill(
-                id=row["id"],
-                user_id=row["user_id"],
-                name=row["name"],
-                dosage=row["dosage"],
-                photo_id=row["photo_id"],
-                notes=row["notes"],
-            )
-        return None
+    generation = _pill_cache.generation()
+    async with _reader() as db:
+        cursor = await db.execute(_GET_PILL_SQL, (pill_id,))
+        cursor.row_factory = _pill_factory
+        pill = await cursor.fetchone()
+    if pill is not None:
+        _pill_cache.put(pill_id, pill, generation)
+    return pill
 
 
 async def delete_pill(pill_id: int) -> bool:
     """Delete a pill and its schedules."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _transaction() as db:
         cursor = await db.execute("DELETE FROM pills WHERE id = ?", (pill_id,))
-        await db.commit()
-        return cursor.rowcount > 0
+    _pill_cache.invalidate(pill_id)
+    return cursor.rowcount > 0
+
+
+async def delete_pill_owned(pill_id: int, telegram_id: int, chat_id: int) -> Optional[str]:
+    """Delete a pill if it belongs to the given user; return its name, or None if nothing was deleted."""
+    async with _transaction() as db:
+        cursor = await db.execute(
+            """
+            DELETE FROM pills
+            WHERE id = ?
+              AND user_id = (SELECT id FROM users WHERE telegram_id = ? AND chat_id = ?)
+            RETURNING name
+            """,
+            (pill_id, telegram_id, chat_id),
+        )
+        row = await cursor.fetchone()
+    _pill_cache.invalidate(pill_id)
+    return row["name"] if row else None
+
+
+def _build_update_pill_sql() -> dict[tuple[bool, ...], str]:
+    """Build one fixed UPDATE per combination of changed fields, keyed by which are set."""
+    columns = ("name", "dosage", "photo_id")
+    statements = {}
+    for mask in product((False, True), repeat=len(columns)):
+        assignments = ", ".join(f"{column} = ?" for column, on in zip(columns, mask) if on)
+        if assignments:
+            statements[mask] = f"UPDATE pills SET {assignments} WHERE id = ?"
+    return statements
+
+
+# Fixed statement texts let SQLite reuse its prepared statements across calls
+_UPDATE_PILL_SQL = _build_update_pill_sql()
 
 
 async def update_pill(
@@ -234,35 +475,49 @@ async def update_pill(
     photo_id: Optional[str] = None,
 ) -> bool:
     """Update pill fields."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        updates = []
-        params = []
-
-        if name is not None:
-            updates.append("name = ?")
-            params.append(name)
-        if dosage is not None:
-            updates.append("dosage = ?")
-            params.append(dosage)
-        if photo_id is not None:
-            updates.append("photo_id = ?")
-            params.append(photo_id)
-
-        if not updates:
-            return False
-
-        params.append(pill_id)
-        query = f"UPDATE pills SET {', '.join(updates)} WHERE id = ?"
+    values = (name, dosage, photo_id)
+    mask = tuple(value is not None for value in values)
+    query = _UPDATE_PILL_SQL.get(mask)
+    if query is None:
+        return False
+
+    params = [value for value in values if value is not None]
+    params.append(pill_id)
+    async with _transaction() as db:
         cursor = await db.execute(query, params)
-        await db.commit()
-        return cursor.rowcount > 0
+    _pill_cache.invalidate(pill_id)
+    return cursor.rowcount > 0
 
 
 # Schedule operations
+
+# Matches schedules due on a given date; bind with _due_on_date_params()
+_DUE_ON_DATE_SQL = """(
+    COALESCE(s.frequency, 'daily') = 'daily'
+    OR (s.frequency IN ('weekly', 'specific_days') AND (s.days_mask & ?) != 0)
+    OR (s.frequency = 'monthly' AND (s.days_mask & ?) != 0)
+    OR (s.frequency = 'interval' AND (
+        COALESCE(s.start_date, '') = ''
+        OR (? >= julianday(s.start_date)
+            AND CAST(? - julianday(s.start_date) AS INTEGER)
+                % COALESCE(NULLIF(s.interval_days, 0), 1) = 0)
+    ))
+)"""
+
+
+def _due_on_date_params(ctx: TickContext) -> tuple:
+    """Bind parameters for _DUE_ON_DATE_SQL."""
+    return ctx.week_bit, ctx.month_bit, ctx.julian_day, ctx.julian_day
+
+
+_INSERT_SCHEDULE_SQL = """INSERT INTO schedules (pill_id, time, days_mask, frequency, interval_days, start_date)
+   VALUES (?, ?, ?, ?, ?, ?)"""
+
+
 async def add_schedule(
     pill_id: int,
     time: str,
-    days: list[int],
+    days: Sequence[int],
     frequency: str = "daily",
     interval_days: int = 1,
     start_date: Optional[str] = None,
@@ -276,345 +531,259 @@ async def add_schedule(
     if start_date is None:
         start_date = date.today().isoformat()
 
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _transaction() as db:
         cursor = await db.execute(
-            """INSERT INTO schedules (pill_id, time, days, frequency, interval_days, start_date)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (pill_id, time, json.dumps(days), frequency, interval_days, start_date),
+            _INSERT_SCHEDULE_SQL,
+            (pill_id, time, days_to_mask(days), frequency, interval_days, start_date),
         )
-        await db.commit()
-
-        return Schedule(
-            id=cursor.lastrowid,
-            pill_id=pill_id,
-            time=time,
-            days=days,
-            frequency=frequency,
-            interval_days=interval_days,
-            start_date=start_date,
+
+    return Schedule(
+        id=cursor.lastrowid,
+        pill_id=pill_id,
+        time=time,
+        days=list(days),
+        frequency=frequency,
+        interval_days=interval_days,
+        start_date=start_date,
+    )
+
+
+async def add_pill_with_schedule(
+    user_id: int,
+    name: str,
+    dosage: str,
+    photo_id: Optional[str],
+    time: str,
+    days: Sequence[int],
+    frequency: str = "daily",
+    interval_days: int = 1,
+) -> tuple[Pill, Schedule]:
+    """Add a new pill and its first schedule in one transaction."""
+    start_date = date.today().isoformat()
+
+    async with _transaction() as db:
+        cursor = await db.execute(_INSERT_PILL_SQL, (user_id, name, dosage, photo_id, None))
+        pill_id = cursor.lastrowid
+        cursor = await db.execute(
+            _INSERT_SCHEDULE_SQL,
+            (pill_id, time, days_to_mask(days), frequency, interval_days, start_date),
         )
 
+    pill = Pill(id=pill_id, user_id=user_id, name=name, dosage=dosage, photo_id=photo_id)
+    schedule = Schedule(
+        id=cursor.lastrowid,
+        pill_id=pill_id,
+        time=time,
+        days=list(days),
+        frequency=frequency,
+        interval_days=interval_days,
+        start_date=start_date,
+    )
+    return pill, schedule
+
 
 async def get_pill_schedules(pill_id: int) -> list[Schedule]:
     """Get all schedules for a pill."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _reader() as db:
         cursor = await db.execute(
-            "SELECT * FROM schedules WHERE pill_id = ? AND is_active = 1",
+            f"SELECT {_SCHEDULE_COLUMNS} FROM schedules WHERE pill_id = ? AND is_active = 1",
             (pill_id,),
         )
-        rows = await cursor.fetchall()
+        cursor.row_factory = _schedule_factory
+        return await cursor.fetchall()
 
-        return [
-            Schedule(
-                id=row["id"],
-                pill_id=row["pill_id"],
-                time=row["time"],
-                days=json.loads(row["days"]),
-                frequency=row["frequency"] or "daily",
-                interval_days=row["interval_days"] or 1,
-                start_date=row["start_date"],
-                is_active=bool(row["is_active"]),
-            )
-            for row in rows
-        ]
 
+async def get_schedules_for_pills(pill_ids: list[int]) -> dict[int, list[Schedule]]:
+    """Get active schedules for several pills, grouped by pill_id."""
+    schedules = {}
+    async with _reader() as db:
+        for start in range(0, len(pill_ids), _MAX_SQL_PARAMS):
+            batch = pill_ids[start:start + _MAX_SQL_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            cursor = await db.execute(
+                f"SELECT {_SCHEDULE_COLUMNS} FROM schedules"
+                f" WHERE pill_id IN ({placeholders}) AND is_active = 1",
+                batch,
+            )
+            cursor.row_factory = _schedule_factory
+            for schedule in await cursor.fetchall():
+                schedules.setdefault(schedule.pill_id, []).append(schedule)
+    return schedules
 
-async def get_schedules_for_time_range(time_from: str, time_to: str, current_date: date) -> list[dict]:
-    """Get all active schedules for today within a time range (inclusive)."""
-    day_of_week = current_date.isoweekday()
-    day_of_month = current_date.day
 
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+async def get_schedules_for_time_range(time_from: str, time_to: str, ctx: TickContext) -> list[aiosqlite.Row]:
+    """Get active schedules due today within a time range (inclusive) that have no intake log today yet."""
+    async with _reader() as db:
         cursor = await db.execute(
-            """
-            SELECT s.*, p.name as pill_name, p.dosage, p.photo_id,
+            f"""
+            SELECT s.id, s.time, p.name as pill_name, p.dosage,
                    u.telegram_id, u.chat_id, u.username, u.first_name
             FROM schedules s
             JOIN pills p ON s.pill_id = p.id
             JOIN users u ON p.user_id = u.id
             WHERE s.time >= ? AND s.time <= ? AND s.is_active = 1
+              AND {_DUE_ON_DATE_SQL}
+              AND NOT EXISTS (
+                  SELECT 1 FROM intake_logs il
+                  WHERE il.schedule_id = s.id
+                    AND il.scheduled_time >= ? AND il.scheduled_time < ?
+              )
             ORDER BY s.time
             """,
-            (time_from, time_to),
+            (time_from, time_to, *_due_on_date_params(ctx), ctx.day_start, ctx.day_end),
         )
-        rows = await cursor.fetchall()
+        return await cursor.fetchall()
 
-        result = []
-        for row in rows:
-            row_dict = dict(row)
-            days = json.loads(row["days"])
-            frequency = row["frequency"] or "daily"
-            interval_days = row["interval_days"] or 1
-            start_date_str = row["start_date"]
-
-            should_remind = False
-
-            if frequency == "daily":
-                should_remind = True
-            elif frequency == "weekly" or frequency == "specific_days":
-                should_remind = day_of_week in days
-            elif frequency == "monthly":
-                should_remind = day_of_month in days
-            elif frequency == "interval":
-                if start_date_str:
-                    start = date.fromisoformat(start_date_str)
-                    days_passed = (current_date - start).days
-                    should_remind = days_passed >= 0 and days_passed % interval_days == 0
-                else:
-                    should_remind = True
-
-            if should_remind:
-                result.append(row_dict)
-
-        return result
-
-
-async def get_schedules_for_time(time_str: str, current_date: date) -> list[dict]:
-    """Get all active schedules for a specific time and date."""
-    day_of_week = current_date.isoweekday()
-    day_of_month = current_date.day
 
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+async def get_schedules_for_time(time_str: str, ctx: TickContext) -> list[aiosqlite.Row]:
+    """Get all active schedules for a specific time and date."""
+    async with _reader() as db:
         cursor = await db.execute(
-            """
-            SELECT s.*, p.name as pill_name, p.dosage, p.photo_id,
+            f"""
+            SELECT s.id, s.time, p.name as pill_name, p.dosage,
                    u.telegram_id, u.chat_id, u.username, u.first_name
             FROM schedules s
             JOIN pills p ON s.pill_id = p.id
             JOIN users u ON p.user_id = u.id
             WHERE s.time = ? AND s.is_active = 1
+              AND {_DUE_ON_DATE_SQL}
             """,
-            (time_str,),
+            (time_str, *_due_on_date_params(ctx)),
         )
-        rows = await cursor.fetchall()
-
-        result = []
-        for row in rows:
-            row_dict = dict(row)
-            days = json.loads(row["days"])
-            frequency = row["frequency"] or "daily"
-            interval_days = row["interval_days"] or 1
-            start_date_str = row["start_date"]
-
-            should_remind = False
-
-            if frequency == "daily":
-                should_remind = True
-            elif frequency == "weekly" or frequency == "specific_days":
-                should_remind = day_of_week in days
-            elif frequency == "monthly":
-                should_remind = day_of_month in days
-            elif frequency == "interval":
-                if start_date_str:
-                    start = date.fromisoformat(start_date_str)
-                    days_passed = (current_date - start).days
-                    should_remind = days_passed >= 0 and days_passed % interval_days == 0
-                else:
-                    should_remind = True
-
-            if should_remind:
-                result.append(row_dict)
-
-        return result
+        return await cursor.fetchall()
 
 
 async def delete_schedule(schedule_id: int) -> bool:
     """Delete a schedule."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _transaction() as db:
         cursor = await db.execute(
             "DELETE FROM schedules WHERE id = ?", (schedule_id,)
         )
-        await db.commit()
-        return cursor.rowcount > 0
+    return cursor.rowcount > 0
 
 
 # Intake log operations
-async def create_intake_log(schedule_id: int, scheduled_time: datetime) -> IntakeLog:
+async def create_intake_log(
+    schedule_id: int, scheduled_time: datetime, telegram_id: int, chat_id: int
+) -> IntakeLog:
     """Create an intake log entry."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute(
-            """INSERT INTO intake_logs (schedule_id, scheduled_time, status)
-               VALUES (?, ?, 'pending')""",
-            (schedule_id, scheduled_time.isoformat()),
-        )
-        await db.commit()
+    return (await create_intake_logs([(schedule_id, scheduled_time, telegram_id, chat_id)]))[0]
 
-        return IntakeLog(
-            id=cursor.lastrowid,
-            schedule_id=schedule_id,
-            scheduled_time=scheduled_time,
-        )
+
+async def create_intake_logs(entries: list[tuple[int, datetime, int, int]]) -> list[IntakeLog]:
+    """Create intake log entries with one commit.
+
+    entries: (schedule_id, scheduled_time, telegram_id, chat_id) of the schedule's owner
+    """
+    logs = []
+    async with _transaction() as db:
+        # executemany can't report the new row ids, so each row uses INSERT ... RETURNING;
+        # the statement is prepared once and the whole batch still commits once
+        for schedule_id, scheduled_time, telegram_id, chat_id in entries:
+            cursor = await db.execute(
+                """INSERT INTO intake_logs (schedule_id, scheduled_time, status, telegram_id, chat_id)
+                   VALUES (?, ?, 'pending', ?, ?)
+                   RETURNING id""",
+                (schedule_id, int(scheduled_time.timestamp()), telegram_id, chat_id),
+            )
+            row = await cursor.fetchone()
+            logs.append(IntakeLog(id=row["id"], schedule_id=schedule_id, scheduled_time=scheduled_time))
+    return logs
 
 
 async def get_intake_log(log_id: int) -> Optional[IntakeLog]:
     """Get intake log by id."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _reader() as db:
+        cursor = await db.execute(_GET_INTAKE_LOG_SQL, (log_id,))
+        cursor.row_factory = _intake_log_factory
+        return await cursor.fetchone()
+
+
+async def get_log_with_owner(log_id: int) -> Optional[aiosqlite.Row]:
+    """Get intake log by id with its schedule frequency and owner's telegram_id."""
+    async with _reader() as db:
         cursor = await db.execute(
-            "SELECT * FROM intake_logs WHERE id = ?", (log_id,)
+            """
+            SELECT il.id, il.status, il.schedule_id, il.telegram_id, s.frequency
+            FROM intake_logs il
+            JOIN schedules s ON il.schedule_id = s.id
+            WHERE il.id = ?
+            """,
+            (log_id,),
         )
-        row = await cursor.fetchone()
-
-        if row:
-            return IntakeLog(
-                id=row["id"],
-                schedule_id=row["schedule_id"],
-                scheduled_time=datetime.fromisoformat(row["scheduled_time"]),
-                taken_at=(
-                    datetime.fromisoformat(row["taken_at"])
-                    if row["taken_at"]
-                    else None
-                ),
-                status=row["status"],
-            )
-        return None
+        return await cursor.fetchone()
 
 
 async def update_intake_status(
     log_id: int, status: str, taken_at: Optional[datetime] = None
 ) -> bool:
     """Update intake log status."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _transaction() as db:
         if taken_at:
             cursor = await db.execute(
                 "UPDATE intake_logs SET status = ?, taken_at = ? WHERE id = ?",
-                (status, taken_at.isoformat(), log_id),
+                (status, int(taken_at.timestamp()), log_id),
             )
         else:
             cursor = await db.execute(
                 "UPDATE intake_logs SET status = ? WHERE id = ?", (status, log_id)
             )
-        await db.commit()
-        return cursor.rowcount > 0
+    return cursor.rowcount > 0
+
+
+async def mark_taken(log_id: int, taken_at: datetime, interval_schedule_id: Optional[int] = None) -> bool:
+    """Mark intake log as taken, restarting an interval schedule from taken_at's date in the same commit."""
+    async with _transaction() as db:
+        cursor = await db.execute(
+            "UPDATE intake_logs SET status = 'taken', taken_at = ? WHERE id = ?",
+            (int(taken_at.timestamp()), log_id),
+        )
+        if interval_schedule_id is not None:
+            await db.execute(
+                "UPDATE schedules SET start_date = ? WHERE id = ?",
+                (taken_at.date().isoformat(), interval_schedule_id),
+            )
+    return cursor.rowcount > 0
 
 
-async def get_pending_logs_for_today(chat_id: int) -> list[dict]:
+async def get_pending_logs_for_today(chat_id: int) -> list[aiosqlite.Row]:
     """Get all pending intake logs for today for a specific chat."""
-    today = date.today().isoformat()
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    ctx = TickContext.at(datetime.now(TZ))
+    async with _reader() as db:
         cursor = await db.execute(
             """
-            SELECT il.*, s.time, p.name as pill_name, p.dosage,
-                   u.telegram_id, u.username, u.first_name
+            SELECT il.id, il.schedule_id, il.scheduled_time, il.telegram_id, s.time,
+                   p.name as pill_name, p.dosage
             FROM intake_logs il
             JOIN schedules s ON il.schedule_id = s.id
             JOIN pills p ON s.pill_id = p.id
-            JOIN users u ON p.user_id = u.id
-            WHERE u.chat_id = ?
+            WHERE il.chat_id = ?
               AND il.status = 'pending'
-              AND date(il.scheduled_time) = ?
+              AND il.scheduled_time >= ? AND il.scheduled_time < ?
             """,
-            (chat_id, today),
+            (chat_id, ctx.day_start, ctx.day_end),
         )
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        return await cursor.fetchall()
 
 
 async def get_user_today_schedule(user_id: int) -> list[dict]:
     """Get today's schedule for a user with intake status."""
-    today = date.today()
-    day_of_week = today.isoweekday()
-    day_of_month = today.day
+    ctx = TickContext.at(datetime.now(TZ))
 
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _reader() as db:
         cursor = await db.execute(
-            """
-            SELECT s.*, p.name as pill_name, p.dosage, p.photo_id,
+            f"""
+            SELECT s.id, s.time, p.name as pill_name, p.dosage,
                    il.id as log_id, il.status as intake_status, il.taken_at
             FROM schedules s
             JOIN pills p ON s.pill_id = p.id
             LEFT JOIN intake_logs il ON s.id = il.schedule_id
-                AND date(il.scheduled_time) = ?
+                AND il.scheduled_time >= ? AND il.scheduled_time < ?
             WHERE p.user_id = ? AND s.is_active = 1
+              AND {_DUE_ON_DATE_SQL}
             ORDER BY s.time
             """,
-            (today.isoformat(), user_id),
-        )
-        rows = await cursor.fetchall()
-
-        result = []
-        for row in rows:
-            row_dict = dict(row)
-            days = json.loads(row["days"])
-            frequency = row["frequency"] or "daily"
-            interval_days = row["interval_days"] or 1
-            start_date_str = row["start_date"]
-
-            should_show = False
-
-            if frequency == "daily":
-                should_show = True
-            elif frequency == "weekly" or frequency == "specific_days":
-                should_show = day_of_week in days
-            elif frequency == "monthly":
-                should_show = day_of_month in days
-            elif frequency == "interval":
-                if start_date_str:
-                    start = date.fromisoformat(start_date_str)
-                    days_passed = (today - start).days
-                    should_show = days_passed >= 0 and days_passed % interval_days == 0
-                else:
-                    should_show = True
-
-            if should_show:
-                result.append(row_dict)
-
-        return result
-
-
-async def check_existing_log(schedule_id: int, scheduled_date: date) -> bool:
-    """Check if intake log already exists for schedule and date."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute(
-            """
-            SELECT id FROM intake_logs
-            WHERE schedule_id = ? AND date(scheduled_time) = ?
-            """,
-            (schedule_id, scheduled_date.isoformat()),
-        )
-        row = await cursor.fetchone()
-        return row is not None
-
-
-async def update_reminder_count(log_id: int, reminder_time: datetime) -> bool:
-    """Update reminder count and last reminder time."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute(
-            """
-            UPDATE intake_logs
-            SET reminder_count = reminder_count + 1, last_reminder_at = ?
-            WHERE id = ?
-            """,
-            (reminder_time.isoformat(), log_id),
-        )
-        await db.commit()
-        return cursor.rowcount > 0
-
-
-async def get_logs_for_followup_reminder(hours_ago: int) -> list[dict]:
-    """Get pending logs that need one follow-up reminder after N hours (no response)."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            """
-            SELECT il.*, s.time, s.pill_id, s.frequency, s.interval_days, s.start_date,
-                   p.name as pill_name, p.dosage, p.photo_id,
-                   u.telegram_id, u.chat_id, u.username, u.first_name
-            FROM intake_logs il
-            JOIN schedules s ON il.schedule_id = s.id
-            JOIN pills p ON s.pill_id = p.id
-            JOIN users u ON p.user_id = u.id
-            WHERE il.status = 'pending'
-              AND date(il.scheduled_time) = date('now')
-              AND il.reminder_count = 0
-              AND datetime(il.scheduled_time, '+' || ? || ' hours') <= datetime('now')
-            """,
-            (hours_ago,),
+            (ctx.day_start, ctx.day_end, user_id, *_due_on_date_params(ctx)),
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
@@ -622,49 +791,48 @@ async def get_logs_for_followup_reminder(hours_ago: int) -> list[dict]:
 
 async def update_schedule_start_date(schedule_id: int, new_start_date: str) -> bool:
     """Update schedule start_date (for interval-based schedules after confirmation)."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _transaction() as db:
         cursor = await db.execute(
             "UPDATE schedules SET start_date = ? WHERE id = ?",
             (new_start_date, schedule_id),
         )
-        await db.commit()
-        return cursor.rowcount > 0
+    return cursor.rowcount > 0
 
 
-async def get_intake_logs_by_ids(log_ids: list[int]) -> list[dict]:
-    """Get intake logs with pill info by list of IDs."""
-    if not log_ids:
-        return []
-    placeholders = ",".join("?" * len(log_ids))
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            f"""
-            SELECT il.id, il.status, il.taken_at, il.schedule_id,
-                   p.name as pill_name, p.dosage,
-                   s.frequency, s.id as schedule_id,
-                   u.telegram_id
-            FROM intake_logs il
-            JOIN schedules s ON il.schedule_id = s.id
-            JOIN pills p ON s.pill_id = p.id
-            JOIN users u ON p.user_id = u.id
-            WHERE il.id IN ({placeholders})
-            ORDER BY il.id
-            """,
-            log_ids,
-        )
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+async def get_intake_logs_by_ids(log_ids: list[int]) -> list[aiosqlite.Row]:
+    """Get intake logs with pill info by list of IDs, one query per batch of IDs."""
+    rows = []
+    async with _reader() as db:
+        # Stay under SQLite's default limit of 999 bound parameters per statement
+        for start in range(0, len(log_ids), _MAX_SQL_PARAMS):
+            batch = log_ids[start:start + _MAX_SQL_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            cursor = await db.execute(
+                f"""
+                SELECT il.id, il.status, il.taken_at, il.schedule_id,
+                       p.name as pill_name, p.dosage,
+                       s.frequency, s.id as schedule_id,
+                       u.telegram_id
+                FROM intake_logs il
+                JOIN schedules s ON il.schedule_id = s.id
+                JOIN pills p ON s.pill_id = p.id
+                JOIN users u ON p.user_id = u.id
+                WHERE il.id IN ({placeholders})
+                ORDER BY il.id
+                """,
+                batch,
+            )
+            rows.extend(await cursor.fetchall())
+        return rows
 
 
-async def get_schedule_by_id(schedule_id: int) -> Optional[dict]:
-    """Get schedule by ID with full details."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+async def get_schedule_by_id(schedule_id: int) -> Optional[aiosqlite.Row]:
+    """Get schedule by ID with its pill and owner."""
+    async with _reader() as db:
         cursor = await db.execute(
             """
-            SELECT s.*, p.name as pill_name, p.dosage, p.photo_id,
-                   u.telegram_id, u.chat_id, u.username, u.first_name
+            SELECT s.id, s.pill_id, s.time, s.frequency, s.interval_days, s.start_date,
+                   p.name as pill_name, p.dosage, u.telegram_id, u.chat_id
             FROM schedules s
             JOIN pills p ON s.pill_id = p.id
             JOIN users u ON p.user_id = u.id
@@ -672,7 +840,4 @@ async def get_schedule_by_id(schedule_id: int) -> Optional[dict]:
             """,
             (schedule_id,),
         )
-        row = await cursor.fetchone()
-        if row:
-            return dict(row)
-        return None
+        return await cursor.fetchone()
@@ -1,6 +1,6 @@
-import re
 from datetime import datetime, date
-import pytz
+from html import escape
+from zoneinfo import ZoneInfo
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 
@@ -9,7 +9,7 @@ from config import TIMEZONE
 
 router = Router()
 
-TZ = pytz.timezone(TIMEZONE)
+TZ = ZoneInfo(TIMEZONE)
 
 
 def get_now():
@@ -27,10 +27,11 @@ def extract_log_ids_from_markup(markup) -> list[int]:
         return []
     for row in markup.inline_keyboard:
         for btn in row:
-            if btn.callback_data:
-                match = re.search(r"(?:taken|missed)_(\d+)", btn.callback_data)
-                if match:
-                    log_ids.add(int(match.group(1)))
+            data = btn.callback_data
+            if data and data.startswith(("taken_", "missed_")):
+                tail = data.rpartition("_")[2]
+                if tail.isdigit():
+                    log_ids.add(int(tail))
     return sorted(log_ids)
 
 
@@ -59,32 +60,27 @@ async def rebuild_message(callback: CallbackQuery, current_log_id: int):
     original_text = callback.message.text or callback.message.caption or ""
     first_line = original_text.split("\n")[0] if original_text else ""
 
-    # Build updated text
-    lines = [first_line, ""]
+    # Build updated text; message.text is the plain rendering, so escape it like the pill fields
+    lines = [escape(first_line), ""]
     for log in logs:
-        status = log.get("status", "pending")
+        status = log["status"]
+        pill = f"{escape(log['pill_name'])} ({escape(log['dosage'])})"
         if status == "taken":
-            taken_at = log.get("taken_at", "")
-            time_str = ""
-            if taken_at:
-                try:
-                    t = datetime.fromisoformat(taken_at)
-                    time_str = t.strftime("%H:%M")
-                except:
-                    pass
+            taken_at = log["taken_at"]
+            time_str = datetime.fromtimestamp(taken_at, TZ).strftime("%H:%M") if taken_at else ""
             suffix = f" — выпито в {time_str}" if time_str else ""
-            lines.append(f"✅ {log['pill_name']} ({log['dosage']}){suffix}")
+            lines.append(f"✅ {pill}{suffix}")
         elif status == "missed":
-            lines.append(f"❌ {log['pill_name']} ({log['dosage']}) — пропущено")
+            lines.append(f"❌ {pill} — пропущено")
         else:
-            lines.append(f"⏳ {log['pill_name']} ({log['dosage']})")
+            lines.append(f"⏳ {pill}")
 
     text = "\n".join(lines)
 
     # Build keyboard only for still-pending pills
     buttons = []
     for log in logs:
-        if log.get("status", "pending") == "pending":
+        if log["status"] == "pending":
             buttons.append([
                 InlineKeyboardButton(text=f"✅ {log['pill_name']}", callback_data=f"taken_{log['id']}"),
                 InlineKeyboardButton(text=f"❌ {log['pill_name']}", callback_data=f"missed_{log['id']}"),
@@ -101,44 +97,24 @@ async def rebuild_message(callback: CallbackQuery, current_log_id: int):
 @router.callback_query(F.data.startswith("taken_"))
 async def confirm_taken(callback: CallbackQuery):
     """Confirm pill was taken."""
-    log_id = int(callback.data.replace("taken_", ""))
+    log_id = int(callback.data.removeprefix("taken_"))
 
-    log = await db.get_intake_log(log_id)
+    log = await db.get_log_with_owner(log_id)
     if not log:
         await callback.answer("Запись не найдена", show_alert=True)
         return
 
-    import aiosqlite
-    from config import DB_PATH
-
-    async with aiosqlite.connect(DB_PATH) as conn:
-        conn.row_factory = aiosqlite.Row
-        cursor = await conn.execute(
-            """
-            SELECT u.telegram_id, p.name, p.dosage, s.frequency, s.id as schedule_id
-            FROM schedules s
-            JOIN pills p ON s.pill_id = p.id
-            JOIN users u ON p.user_id = u.id
-            WHERE s.id = ?
-            """,
-            (log.schedule_id,),
-        )
-        row = await cursor.fetchone()
-
-    if not row or row["telegram_id"] != callback.from_user.id:
+    if log["telegram_id"] != callback.from_user.id:
         await callback.answer("Это не твоя таблетка!", show_alert=True)
         return
 
-    if log.status == "taken":
+    if log["status"] == "taken":
         await callback.answer("Уже отмечено как выпито!")
         return
 
-    now = get_now()
-    await db.update_intake_status(log_id, "taken", now)
-
-    if row["frequency"] == "interval":
-        today_str = get_today().isoformat()
-        await db.update_schedule_start_date(row["schedule_id"], today_str)
+    # Interval schedules restart counting from the day the pill was taken
+    interval_schedule_id = log["schedule_id"] if log["frequency"] == "interval" else None
+    await db.mark_taken(log_id, get_now(), interval_schedule_id)
 
     await callback.answer("Отлично! Отмечено как выпито.")
     await rebuild_message(callback, log_id)
@@ -147,35 +123,18 @@ async def confirm_taken(callback: CallbackQuery):
 @router.callback_query(F.data.startswith("missed_"))
 async def confirm_missed(callback: CallbackQuery):
     """Confirm pill was missed."""
-    log_id = int(callback.data.replace("missed_", ""))
+    log_id = int(callback.data.removeprefix("missed_"))
 
-    log = await db.get_intake_log(log_id)
+    log = await db.get_log_with_owner(log_id)
     if not log:
         await callback.answer("Запись не найдена", show_alert=True)
         return
 
-    import aiosqlite
-    from config import DB_PATH
-
-    async with aiosqlite.connect(DB_PATH) as conn:
-        conn.row_factory = aiosqlite.Row
-        cursor = await conn.execute(
-            """
-            SELECT u.telegram_id, p.name, p.dosage
-            FROM schedules s
-            JOIN pills p ON s.pill_id = p.id
-            JOIN users u ON p.user_id = u.id
-            WHERE s.id = ?
-            """,
-            (log.schedule_id,),
-        )
-        row = await cursor.fetchone()
-
-    if not row or row["telegram_id"] != callback.from_user.id:
+    if log["telegram_id"] != callback.from_user.id:
         await callback.answer("Это не твоя таблетка!", show_alert=True)
         return
 
-    if log.status == "missed":
+    if log["status"] == "missed":
         await callback.answer("Уже отмечено как пропущено!")
         return
 
@@ -1,3 +1,8 @@
+import asyncio
+import re
+from datetime import datetime
+from html import escape
+from zoneinfo import ZoneInfo
 from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, InputMediaPhoto
 from aiogram.filters import Command, StateFilter
@@ -5,9 +10,13 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 import database as db
+from config import TIMEZONE
+from models import ALL_DAYS, DAY_NAMES
 
 router = Router()
 
+TZ = ZoneInfo(TIMEZONE)
+
 
 class AddPillStates(StatesGroup):
     waiting_for_name = State()
@@ -27,11 +36,87 @@ class EditPillStates(StatesGroup):
     waiting_for_new_photo = State()
 
 
+# H:MM or HH:MM, 00:00-23:59; single-digit parts are zero-padded before saving
+TIME_RE = re.compile(r"([01]?\d|2[0-3]):([0-5]?\d)")
+
+# Intake status -> emoji for /today
+STATUS_EMOJI = {
+    "taken": "✅",
+    "missed": "❌",
+    "pending": "⏳",
+    "reminded": "🔔",
+    None: "⏳",
+}
+
+# Static keyboards, built once; aiogram types are immutable so they can be shared
+SKIP_PHOTO_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="Пропустить", callback_data="skip_photo")]
+    ]
+)
+
+FREQUENCY_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="Ежедневно", callback_data="freq_daily")],
+        [InlineKeyboardButton(text="Через день", callback_data="freq_interval_2")],
+        [InlineKeyboardButton(text="Каждые N дней", callback_data="freq_interval_custom")],
+        [InlineKeyboardButton(text="Раз в неделю", callback_data="freq_weekly")],
+        [InlineKeyboardButton(text="Раз в месяц", callback_data="freq_monthly")],
+    ]
+)
+
+WEEKDAY_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [
+            InlineKeyboardButton(text="Пн", callback_data="weekday_1"),
+            InlineKeyboardButton(text="Вт", callback_data="weekday_2"),
+            InlineKeyboardButton(text="Ср", callback_data="weekday_3"),
+            InlineKeyboardButton(text="Чт", callback_data="weekday_4"),
+        ],
+        [
+            InlineKeyboardButton(text="Пт", callback_data="weekday_5"),
+            InlineKeyboardButton(text="Сб", callback_data="weekday_6"),
+            InlineKeyboardButton(text="Вс", callback_data="weekday_7"),
+        ],
+    ]
+)
+
+TIME_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [
+            InlineKeyboardButton(text="Утро 08:00", callback_data="time_08:00"),
+            InlineKeyboardButton(text="День 14:00", callback_data="time_14:00"),
+        ],
+        [
+            InlineKeyboardButton(text="Вечер 20:00", callback_data="time_20:00"),
+            InlineKeyboardButton(text="Своё время", callback_data="time_custom"),
+        ],
+    ]
+)
+
+# freq_ choices that go straight to time selection -> schedule fields
+FREQUENCY_PRESETS = {
+    "daily": {"frequency": "daily", "days": ALL_DAYS, "interval_days": 1},
+    "interval_2": {"frequency": "interval", "days": [], "interval_days": 2},
+}
+
+# freq_ choices that ask for more input -> (next state, prompt, keyboard)
+FREQUENCY_PROMPTS = {
+    "interval_custom": (
+        AddPillStates.waiting_for_interval,
+        "Введи количество дней между приёмами (например: 3):",
+        None,
+    ),
+    "weekly": (AddPillStates.waiting_for_weekday, "Выбери день недели:", WEEKDAY_KEYBOARD),
+    "monthly": (AddPillStates.waiting_for_monthday, "Введи число месяца (1-31):", None),
+}
+
+
 def get_user_mention(username: str | None, first_name: str | None) -> str:
     """Get user mention string."""
     if username:
         return f"@{username}"
-    return first_name or "Пользователь"
+    return escape(first_name or "Пользователь")
 
 
 @router.message(Command("start"))
@@ -106,14 +191,9 @@ async def process_pill_dosage(message: Message, state: FSMContext):
     await state.update_data(dosage=message.text)
     await state.set_state(AddPillStates.waiting_for_photo)
 
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="Пропустить", callback_data="skip_photo")]
-        ]
-    )
     await message.answer(
         "Отправь фото таблетки или нажми 'Пропустить':",
-        reply_markup=keyboard,
+        reply_markup=SKIP_PHOTO_KEYBOARD,
     )
 
 
@@ -129,82 +209,51 @@ async def process_pill_photo(message: Message, state: FSMContext):
 async def skip_photo(callback: CallbackQuery, state: FSMContext):
     """Skip photo upload."""
     await state.update_data(photo_id=None)
-    await callback.answer()
-    await show_frequency_selection(callback.message, state)
+    await asyncio.gather(
+        callback.answer(),
+        show_frequency_selection(callback.message, state),
+    )
 
 
 async def show_frequency_selection(message: Message, state: FSMContext):
     """Show frequency selection keyboard."""
     await state.set_state(AddPillStates.waiting_for_frequency)
 
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="Ежедневно", callback_data="freq_daily")],
-            [InlineKeyboardButton(text="Через день", callback_data="freq_interval_2")],
-            [InlineKeyboardButton(text="Каждые N дней", callback_data="freq_interval_custom")],
-            [InlineKeyboardButton(text="Раз в неделю", callback_data="freq_weekly")],
-            [InlineKeyboardButton(text="Раз в месяц", callback_data="freq_monthly")],
-        ]
-    )
-    await message.answer("Как часто принимать?", reply_markup=keyboard)
+    await message.answer("Как часто принимать?", reply_markup=FREQUENCY_KEYBOARD)
 
 
 @router.callback_query(AddPillStates.waiting_for_frequency, F.data.startswith("freq_"))
 async def process_frequency_selection(callback: CallbackQuery, state: FSMContext):
     """Process frequency selection."""
-    freq_data = callback.data.replace("freq_", "")
-
-    if freq_data == "daily":
-        await state.update_data(frequency="daily", days=[1, 2, 3, 4, 5, 6, 7], interval_days=1)
-        await callback.answer()
-        await show_time_selection(callback.message, state)
-
-    elif freq_data == "interval_2":
-        await state.update_data(frequency="interval", days=[], interval_days=2)
-        await callback.answer()
-        await show_time_selection(callback.message, state)
-
-    elif freq_data == "interval_custom":
-        await state.set_state(AddPillStates.waiting_for_interval)
-        await callback.message.answer("Введи количество дней между приёмами (например: 3):")
-        await callback.answer()
-
-    elif freq_data == "weekly":
-        await state.set_state(AddPillStates.waiting_for_weekday)
-        keyboard = InlineKeyboardMarkup(
-            inline_keyboard=[
-                [
-                    InlineKeyboardButton(text="Пн", callback_data="weekday_1"),
-                    InlineKeyboardButton(text="Вт", callback_data="weekday_2"),
-                    InlineKeyboardButton(text="Ср", callback_data="weekday_3"),
-                    InlineKeyboardButton(text="Чт", callback_data="weekday_4"),
-                ],
-                [
-                    InlineKeyboardButton(text="Пт", callback_data="weekday_5"),
-                    InlineKeyboardButton(text="Сб", callback_data="weekday_6"),
-                    InlineKeyboardButton(text="Вс", callback_data="weekday_7"),
-                ],
-            ]
+    freq_data = callback.data.removeprefix("freq_")
+
+    preset = FREQUENCY_PRESETS.get(freq_data)
+    if preset is not None:
+        await state.update_data(**preset)
+        await asyncio.gather(
+            callback.answer(),
+            show_time_selection(callback.message, state),
         )
-        await callback.message.answer("Выбери день недели:", reply_markup=keyboard)
-        await callback.answer()
+        return
 
-    elif freq_data == "monthly":
-        await state.set_state(AddPillStates.waiting_for_monthday)
-        await callback.message.answer("Введи число месяца (1-31):")
-        await callback.answer()
+    prompt = FREQUENCY_PROMPTS.get(freq_data)
+    if prompt is not None:
+        next_state, text, keyboard = prompt
+        await state.set_state(next_state)
+        await asyncio.gather(
+            callback.message.answer(text, reply_markup=keyboard),
+            callback.answer(),
+        )
 
 
 @router.message(AddPillStates.waiting_for_interval, F.text)
 async def process_interval_input(message: Message, state: FSMContext):
     """Process custom interval input."""
-    try:
-        interval = int(message.text.strip())
-        if interval < 1 or interval > 365:
-            raise ValueError()
-    except ValueError:
+    text = message.text.strip()
+    if not text.isdecimal() or not 1 <= int(text) <= 365:
         await message.answer("Введи число от 1 до 365:")
         return
+    interval = int(text)
 
     await state.update_data(frequency="interval", days=[], interval_days=interval)
     await show_time_selection(message, state)
@@ -213,22 +262,22 @@ async def process_interval_input(message: Message, state: FSMContext):
 @router.callback_query(AddPillStates.waiting_for_weekday, F.data.startswith("weekday_"))
 async def process_weekday_selection(callback: CallbackQuery, state: FSMContext):
     """Process weekday selection."""
-    weekday = int(callback.data.replace("weekday_", ""))
+    weekday = int(callback.data.removeprefix("weekday_"))
     await state.update_data(frequency="weekly", days=[weekday], interval_days=1)
-    await callback.answer()
-    await show_time_selection(callback.message, state)
+    await asyncio.gather(
+        callback.answer(),
+        show_time_selection(callback.message, state),
+    )
 
 
 @router.message(AddPillStates.waiting_for_monthday, F.text)
 async def process_monthday_input(message: Message, state: FSMContext):
     """Process month day input."""
-    try:
-        day = int(message.text.strip())
-        if day < 1 or day > 31:
-            raise ValueError()
-    except ValueError:
+    text = message.text.strip()
+    if not text.isdecimal() or not 1 <= int(text) <= 31:
         await message.answer("Введи число от 1 до 31:")
         return
+    day = int(text)
 
     await state.update_data(frequency="monthly", days=[day], interval_days=1)
     await show_time_selection(message, state)
@@ -238,73 +287,49 @@ async def show_time_selection(message: Message, state: FSMContext):
     """Show time selection keyboard."""
     await state.set_state(AddPillStates.waiting_for_time)
 
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(text="Утро 08:00", callback_data="time_08:00"),
-                InlineKeyboardButton(text="День 14:00", callback_data="time_14:00"),
-            ],
-            [
-                InlineKeyboardButton(text="Вечер 20:00", callback_data="time_20:00"),
-                InlineKeyboardButton(text="Своё время", callback_data="time_custom"),
-            ],
-        ]
-    )
-    await message.answer("В какое время напоминать?", reply_markup=keyboard)
+    await message.answer("В какое время напоминать?", reply_markup=TIME_KEYBOARD)
 
 
 @router.callback_query(AddPillStates.waiting_for_time, F.data.startswith("time_"))
 async def process_time_selection(callback: CallbackQuery, state: FSMContext):
     """Process time selection."""
-    time_data = callback.data.replace("time_", "")
+    time_data = callback.data.removeprefix("time_")
+    # Stop the button's loading spinner before saving; neither branch needs an alert
+    await callback.answer()
 
     if time_data == "custom":
         await state.set_state(AddPillStates.waiting_for_custom_time)
         await callback.message.answer("Введи время в формате ЧЧ:ММ (например: 09:30):")
-        await callback.answer()
         return
 
     await save_pill(callback.message, state, time_data)
-    await callback.answer()
 
 
 @router.message(AddPillStates.waiting_for_custom_time, F.text)
 async def process_custom_time(message: Message, state: FSMContext):
     """Process custom time input."""
-    time_str = message.text.strip()
-
-    try:
-        parts = time_str.split(":")
-        if len(parts) != 2:
-            raise ValueError()
-        hour, minute = int(parts[0]), int(parts[1])
-        if not (0 <= hour <= 23 and 0 <= minute <= 59):
-            raise ValueError()
-        time_str = f"{hour:02d}:{minute:02d}"
-    except ValueError:
+    match = TIME_RE.fullmatch(message.text.strip())
+    if not match:
         await message.answer("Неверный формат. Введи время в формате ЧЧ:ММ (например: 09:30):")
         return
 
-    await save_pill(message, state, time_str)
+    hour, minute = match.groups()
+    await save_pill(message, state, f"{hour:0>2}:{minute:0>2}")
 
 
 async def save_pill(message: Message, state: FSMContext, time_str: str):
     """Save pill to database."""
     data = await state.get_data()
 
-    pill = await db.add_pill(
+    frequency = data.get("frequency", "daily")
+    days = data.get("days", ALL_DAYS)
+    interval_days = data.get("interval_days", 1)
+
+    pill, schedule = await db.add_pill_with_schedule(
         user_id=data["user_id"],
         name=data["pill_name"],
         dosage=data["dosage"],
         photo_id=data.get("photo_id"),
-    )
-
-    frequency = data.get("frequency", "daily")
-    days = data.get("days", [1, 2, 3, 4, 5, 6, 7])
-    interval_days = data.get("interval_days", 1)
-
-    schedule = await db.add_schedule(
-        pill_id=pill.id,
         time=time_str,
         days=days,
         frequency=frequency,
@@ -316,7 +341,7 @@ async def save_pill(message: Message, state: FSMContext, time_str: str):
     await state.clear()
     await message.answer(
         f"Таблетка добавлена!\n\n"
-        f"<b>{pill.name}</b> ({pill.dosage})\n"
+        f"<b>{escape(pill.name)}</b> ({escape(pill.dosage)})\n"
         f"Время приёма: {time_str}\n"
         f"Частота: {freq_text}"
     )
@@ -331,8 +356,7 @@ def get_frequency_text(frequency: str, days: list[int], interval_days: int) -> s
             return "через день"
         return f"каждые {interval_days} дн."
     elif frequency == "weekly":
-        day_names = {1: "Пн", 2: "Вт", 3: "Ср", 4: "Чт", 5: "Пт", 6: "Сб", 7: "Вс"}
-        days_str = ", ".join(day_names[d] for d in days)
+        days_str = ", ".join(DAY_NAMES[d] for d in days)
         return f"раз в неделю ({days_str})"
     elif frequency == "monthly":
         return f"раз в месяц ({days[0]} числа)" if days else "раз в месяц"
@@ -355,8 +379,9 @@ async def cmd_mypills(message: Message):
         )
         return
 
+    pill_schedules = await db.get_schedules_for_pills([pill.id for pill in pills])
     for pill in pills:
-        schedules = await db.get_pill_schedules(pill.id)
+        schedules = pill_schedules.get(pill.id, [])
 
         if schedules:
             schedule_lines = []
@@ -368,8 +393,8 @@ async def cmd_mypills(message: Message):
             schedule_text = "не задано"
 
         text = (
-            f"<b>{pill.name}</b>\n"
-            f"Дозировка: {pill.dosage}\n"
+            f"<b>{escape(pill.name)}</b>\n"
+            f"Дозировка: {escape(pill.dosage)}\n"
             f"Расписание:\n{schedule_text}"
         )
 
@@ -414,14 +439,16 @@ async def cmd_editpill(message: Message):
 @router.callback_query(F.data.startswith("edit_"))
 async def show_edit_options(callback: CallbackQuery):
     """Show edit options for pill."""
-    pill_id = int(callback.data.replace("edit_", ""))
+    pill_id = int(callback.data.removeprefix("edit_"))
 
-    pill = await db.get_pill(pill_id)
+    pill, user = await asyncio.gather(
+        db.get_pill(pill_id),
+        db.get_user(callback.from_user.id, callback.message.chat.id),
+    )
     if not pill:
         await callback.answer("Таблетка не найдена", show_alert=True)
         return
 
-    user = await db.get_user(callback.from_user.id, callback.message.chat.id)
     if not user or pill.user_id != user.id:
         await callback.answer("Это не твоя таблетка!", show_alert=True)
         return
@@ -435,27 +462,33 @@ async def show_edit_options(callback: CallbackQuery):
         ]
     )
 
-    text = f"<b>Редактирование: {pill.name}</b>\n\nЧто изменить?"
+    text = f"<b>Редактирование: {escape(pill.name)}</b>\n\nЧто изменить?"
 
-    await callback.message.answer(text, reply_markup=keyboard)
-    await callback.answer()
+    await asyncio.gather(
+        callback.message.answer(text, reply_markup=keyboard),
+        callback.answer(),
+    )
 
 
 @router.callback_query(F.data.startswith("editname_"))
 async def start_edit_name(callback: CallbackQuery, state: FSMContext):
     """Start editing pill name."""
-    pill_id = int(callback.data.replace("editname_", ""))
+    pill_id = int(callback.data.removeprefix("editname_"))
 
-    pill = await db.get_pill(pill_id)
-    user = await db.get_user(callback.from_user.id, callback.message.chat.id)
+    pill, user = await asyncio.gather(
+        db.get_pill(pill_id),
+        db.get_user(callback.from_user.id, callback.message.chat.id),
+    )
     if not user or not pill or pill.user_id != user.id:
         await callback.answer("Ошибка доступа", show_alert=True)
         return
 
     await state.update_data(edit_pill_id=pill_id)
     await state.set_state(EditPillStates.waiting_for_new_name)
-    await callback.message.answer(f"Текущее название: <b>{pill.name}</b>\n\nВведи новое название:")
-    await callback.answer()
+    await asyncio.gather(
+        callback.message.answer(f"Текущее название: <b>{escape(pill.name)}</b>\n\nВведи новое название:"),
+        callback.answer(),
+    )
 
 
 @router.message(EditPillStates.waiting_for_new_name, F.text)
@@ -466,24 +499,28 @@ async def process_new_name(message: Message, state: FSMContext):
 
     await db.update_pill(pill_id, name=message.text)
     await state.clear()
-    await message.answer(f"Название изменено на: <b>{message.text}</b>")
+    await message.answer(f"Название изменено на: <b>{escape(message.text)}</b>")
 
 
 @router.callback_query(F.data.startswith("editdosage_"))
 async def start_edit_dosage(callback: CallbackQuery, state: FSMContext):
     """Start editing pill dosage."""
-    pill_id = int(callback.data.replace("editdosage_", ""))
+    pill_id = int(callback.data.removeprefix("editdosage_"))
 
-    pill = await db.get_pill(pill_id)
-    user = await db.get_user(callback.from_user.id, callback.message.chat.id)
+    pill, user = await asyncio.gather(
+        db.get_pill(pill_id),
+        db.get_user(callback.from_user.id, callback.message.chat.id),
+    )
     if not user or not pill or pill.user_id != user.id:
         await callback.answer("Ошибка доступа", show_alert=True)
         return
 
     await state.update_data(edit_pill_id=pill_id)
     await state.set_state(EditPillStates.waiting_for_new_dosage)
-    await callback.message.answer(f"Текущая дозировка: <b>{pill.dosage}</b>\n\nВведи новую дозировку:")
-    await callback.answer()
+    await asyncio.gather(
+        callback.message.answer(f"Текущая дозировка: <b>{escape(pill.dosage)}</b>\n\nВведи новую дозировку:"),
+        callback.answer(),
+    )
 
 
 @router.message(EditPillStates.waiting_for_new_dosage, F.text)
@@ -494,24 +531,28 @@ async def process_new_dosage(message: Message, state: FSMContext):
 
     await db.update_pill(pill_id, dosage=message.text)
     await state.clear()
-    await message.answer(f"Дозировка изменена на: <b>{message.text}</b>")
+    await message.answer(f"Дозировка изменена на: <b>{escape(message.text)}</b>")
 
 
 @router.callback_query(F.data.startswith("editphoto_"))
 async def start_edit_photo(callback: CallbackQuery, state: FSMContext):
     """Start editing pill photo."""
-    pill_id = int(callback.data.replace("editphoto_", ""))
+    pill_id = int(callback.data.removeprefix("editphoto_"))
 
-    pill = await db.get_pill(pill_id)
-    user = await db.get_user(callback.from_user.id, callback.message.chat.id)
+    pill, user = await asyncio.gather(
+        db.get_pill(pill_id),
+        db.get_user(callback.from_user.id, callback.message.chat.id),
+    )
     if not user or not pill or pill.user_id != user.id:
         await callback.answer("Ошибка доступа", show_alert=True)
         return
 
     await state.update_data(edit_pill_id=pill_id)
     await state.set_state(EditPillStates.waiting_for_new_photo)
-    await callback.message.answer("Отправь новое фото таблетки:")
-    await callback.answer()
+    await asyncio.gather(
+        callback.message.answer("Отправь новое фото таблетки:"),
+        callback.answer(),
+    )
 
 
 @router.message(EditPillStates.waiting_for_new_photo, F.photo)
@@ -529,8 +570,10 @@ async def process_new_photo(message: Message, state: FSMContext):
 @router.callback_query(F.data == "back_to_mypills")
 async def back_to_mypills(callback: CallbackQuery):
     """Return to pills list."""
-    await callback.message.answer("Используй /mypills чтобы посмотреть список таблеток")
-    await callback.answer()
+    await asyncio.gather(
+        callback.message.answer("Используй /mypills чтобы посмотреть список таблеток"),
+        callback.answer(),
+    )
 
 
 @router.message(Command("deletepill"))
@@ -558,21 +601,20 @@ async def cmd_deletepill(message: Message):
 @router.callback_query(F.data.startswith("delete_"))
 async def process_delete_pill(callback: CallbackQuery):
     """Delete selected pill."""
-    pill_id = int(callback.data.replace("delete_", ""))
-
-    pill = await db.get_pill(pill_id)
-    if not pill:
-        await callback.answer("Таблетка не найдена", show_alert=True)
-        return
-
-    user = await db.get_user(callback.from_user.id, callback.message.chat.id)
-    if not user or pill.user_id != user.id:
-        await callback.answer("Это не твоя таблетка!", show_alert=True)
+    pill_id = int(callback.data.removeprefix("delete_"))
+
+    # Ownership is checked by the DELETE itself
+    name = await db.delete_pill_owned(pill_id, callback.from_user.id, callback.message.chat.id)
+    if name is None:
+        # Nothing deleted; one lookup on this rare path tells "gone" from "someone else's"
+        if await db.get_pill(pill_id):
+            await callback.answer("Это не твоя таблетка!", show_alert=True)
+        else:
+            await callback.answer("Таблетка не найдена", show_alert=True)
         return
 
-    await db.delete_pill(pill_id)
     await callback.answer("Удалено!")
-    await callback.message.edit_text(f"Таблетка <b>{pill.name}</b> удалена.")
+    await callback.message.edit_text(f"Таблетка <b>{escape(name)}</b> удалена.")
 
 
 @router.message(Command("today"))
@@ -588,19 +630,12 @@ async def cmd_today(message: Message):
         await message.answer("На сегодня ничего не запланировано.")
         return
 
-    text = "<b>Расписание на сегодня:</b>\n\n"
+    lines = ["<b>Расписание на сегодня:</b>\n"]
     for item in schedule:
-        status_emoji = {
-            "taken": "✅",
-            "missed": "❌",
-            "pending": "⏳",
-            "reminded": "🔔",
-            None: "⏳",
-        }.get(item.get("intake_status"), "⏳")
-
-        text += f"{status_emoji} {item['time']} - <b>{item['pill_name']}</b> ({item['dosage']})\n"
+        status_emoji = STATUS_EMOJI.get(item.get("intake_status"), "⏳")
+        lines.append(f"{status_emoji} {item['time']} - <b>{escape(item['pill_name'])}</b> ({escape(item['dosage'])})")
 
-    await message.answer(text)
+    await message.answer("\n".join(lines) + "\n")
 
 
 @router.message(Command("status"))
@@ -619,24 +654,17 @@ async def cmd_status(message: Message):
     taken_count = sum(1 for s in schedule if s.get("intake_status") == "taken")
     total_count = len(schedule)
 
-    text = f"<b>Статус приёма ({taken_count}/{total_count}):</b>\n\n"
+    lines = [f"<b>Статус приёма ({taken_count}/{total_count}):</b>\n"]
     for item in schedule:
         status = item.get("intake_status")
         if status == "taken":
-            taken_at = item.get("taken_at", "")
-            time_str = ""
-            if taken_at:
-                try:
-                    from datetime import datetime
-                    t = datetime.fromisoformat(taken_at)
-                    time_str = t.strftime("%H:%M")
-                except:
-                    pass
+            taken_at = item.get("taken_at")
+            time_str = datetime.fromtimestamp(taken_at, TZ).strftime("%H:%M") if taken_at else ""
             suffix = f" — выпито в {time_str}" if time_str else ""
-            text += f"✅ {item['time']} - <b>{item['pill_name']}</b> ({item['dosage']}){suffix}\n"
+            lines.append(f"✅ {item['time']} - <b>{escape(item['pill_name'])}</b> ({escape(item['dosage'])}){suffix}")
         elif status == "missed":
-            text += f"❌ {item['time']} - <b>{item['pill_name']}</b> ({item['dosage']}) — пропущено\n"
+            lines.append(f"❌ {item['time']} - <b>{escape(item['pill_name'])}</b> ({escape(item['dosage'])}) — пропущено")
         else:
-            text += f"⏳ {item['time']} - <b>{item['pill_name']}</b> ({item['dosage']}) — ожидает\n"
+            lines.append(f"⏳ {item['time']} - <b>{escape(item['pill_name'])}</b> ({escape(item['dosage'])}) — ожидает")
 
-    await message.answer(text)
+    await message.answer("\n".join(lines) + "\n")
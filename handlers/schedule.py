@@ -1,8 +1,13 @@
+import asyncio
+from functools import lru_cache
+from html import escape
+
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command
 
 import database as db
+from models import ALL_DAYS, DAY_NAMES, Pill, Schedule, days_to_mask
 
 router = Router()
 
@@ -41,69 +46,84 @@ async def cmd_schedule(message: Message):
 @router.callback_query(F.data.startswith("schedule_pill_"))
 async def show_pill_schedule(callback: CallbackQuery):
     """Show schedule for selected pill."""
-    pill_id = int(callback.data.replace("schedule_pill_", ""))
+    pill_id = int(callback.data.removeprefix("schedule_pill_"))
 
-    pill = await db.get_pill(pill_id)
+    pill, user = await asyncio.gather(
+        db.get_pill(pill_id),
+        db.get_user(callback.from_user.id, callback.message.chat.id),
+    )
     if not pill:
         await callback.answer("Таблетка не найдена", show_alert=True)
         return
 
-    user = await db.get_user(callback.from_user.id, callback.message.chat.id)
     if not user or pill.user_id != user.id:
         await callback.answer("Это не твоя таблетка!", show_alert=True)
         return
 
     schedules = await db.get_pill_schedules(pill_id)
+    text, keyboard = build_schedule_message(pill, schedules)
+
+    await asyncio.gather(
+        callback.message.edit_text(text, reply_markup=keyboard),
+        callback.answer(),
+    )
 
-    text = f"<b>{pill.name}</b> ({pill.dosage})\n\n"
+
+def build_schedule_message(pill: Pill, schedules: list[Schedule]) -> tuple[str, InlineKeyboardMarkup]:
+    """Build the pill schedule text and its management keyboard."""
+    lines = [f"<b>{escape(pill.name)}</b> ({escape(pill.dosage)})\n"]
 
     if schedules:
-        text += "<b>Текущее расписание:</b>\n"
+        lines.append("<b>Текущее расписание:</b>")
         for s in schedules:
-            days_names = get_days_names(s.days)
-            text += f"• {s.time} - {days_names}\n"
+            lines.append(f"• {s.time} - {get_days_names(s.days)}")
     else:
-        text += "Расписание не задано.\n"
+        lines.append("Расписание не задано.")
+    text = "\n".join(lines) + "\n"
 
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
             [InlineKeyboardButton(
                 text="Добавить время",
-                callback_data=f"add_schedule_{pill_id}"
+                callback_data=f"add_schedule_{pill.id}"
             )],
             [InlineKeyboardButton(
                 text="Удалить расписание",
-                callback_data=f"del_schedule_{pill_id}"
+                callback_data=f"del_schedule_{pill.id}"
             )] if schedules else [],
             [InlineKeyboardButton(text="Назад", callback_data="back_to_pills")],
         ]
     )
+    return text, keyboard
 
-    await callback.message.edit_text(text, reply_markup=keyboard)
-    await callback.answer()
+
+_ALL_DAYS_MASK = days_to_mask(ALL_DAYS)
+_WORKDAYS_MASK = days_to_mask([1, 2, 3, 4, 5])
+_WEEKEND_MASK = days_to_mask([6, 7])
 
 
 def get_days_names(days: list[int]) -> str:
     """Convert day numbers to names."""
-    day_names = {
-        1: "Пн", 2: "Вт", 3: "Ср", 4: "Чт",
-        5: "Пт", 6: "Сб", 7: "Вс"
-    }
+    return _days_names(days_to_mask(days))
+
 
-    if days == [1, 2, 3, 4, 5, 6, 7]:
+# Only 128 weekday sets exist, so each label is built once per process
+@lru_cache(maxsize=128)
+def _days_names(mask: int) -> str:
+    if mask == _ALL_DAYS_MASK:
         return "ежедневно"
-    if days == [1, 2, 3, 4, 5]:
+    if mask == _WORKDAYS_MASK:
         return "будни"
-    if days == [6, 7]:
+    if mask == _WEEKEND_MASK:
         return "выходные"
 
-    return ", ".join(day_names[d] for d in sorted(days))
+    return ", ".join(DAY_NAMES[d] for d in Schedule.days_from_mask(mask))
 
 
 @router.callback_query(F.data.startswith("add_schedule_"))
 async def add_schedule_time(callback: CallbackQuery):
     """Show time options for adding schedule."""
-    pill_id = callback.data.replace("add_schedule_", "")
+    pill_id = callback.data.removeprefix("add_schedule_")
 
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
@@ -125,11 +145,13 @@ async def add_schedule_time(callback: CallbackQuery):
         ]
     )
 
-    await callback.message.edit_text(
-        "Выбери время для приёма:",
-        reply_markup=keyboard
+    await asyncio.gather(
+        callback.message.edit_text(
+            "Выбери время для приёма:",
+            reply_markup=keyboard
+        ),
+        callback.answer(),
     )
-    await callback.answer()
 
 
 @router.callback_query(F.data.startswith("newtime_"))
@@ -138,41 +160,31 @@ async def save_new_schedule_time(callback: CallbackQuery):
     _, pill_id, time_str = callback.data.split("_")
     pill_id = int(pill_id)
 
-    pill = await db.get_pill(pill_id)
+    pill, user = await asyncio.gather(
+        db.get_pill(pill_id),
+        db.get_user(callback.from_user.id, callback.message.chat.id),
+    )
     if not pill:
         await callback.answer("Таблетка не найдена", show_alert=True)
         return
 
-    user = await db.get_user(callback.from_user.id, callback.message.chat.id)
     if not user or pill.user_id != user.id:
         await callback.answer("Это не твоя таблетка!", show_alert=True)
         return
 
-    await db.add_schedule(pill_id=pill_id, time=time_str, days=[1, 2, 3, 4, 5, 6, 7])
+    await db.add_schedule(pill_id=pill_id, time=time_str, days=ALL_DAYS)
     await callback.answer("Время добавлено!")
 
     # Show updated schedule
     schedules = await db.get_pill_schedules(pill_id)
-    text = f"<b>{pill.name}</b> ({pill.dosage})\n\n<b>Текущее расписание:</b>\n"
-    for s in schedules:
-        days_names = get_days_names(s.days)
-        text += f"• {s.time} - {days_names}\n"
-
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="Добавить время", callback_data=f"add_schedule_{pill_id}")],
-            [InlineKeyboardButton(text="Удалить расписание", callback_data=f"del_schedule_{pill_id}")],
-            [InlineKeyboardButton(text="Назад", callback_data="back_to_pills")],
-        ]
-    )
-
+    text, keyboard = build_schedule_message(pill, schedules)
     await callback.message.edit_text(text, reply_markup=keyboard)
 
 
 @router.callback_query(F.data.startswith("del_schedule_"))
 async def show_schedules_to_delete(callback: CallbackQuery):
     """Show schedules to delete."""
-    pill_id = int(callback.data.replace("del_schedule_", ""))
+    pill_id = int(callback.data.removeprefix("del_schedule_"))
 
     schedules = await db.get_pill_schedules(pill_id)
     if not schedules:
@@ -189,11 +201,13 @@ async def show_schedules_to_delete(callback: CallbackQuery):
         ] + [[InlineKeyboardButton(text="Отмена", callback_data=f"schedule_pill_{pill_id}")]]
     )
 
-    await callback.message.edit_text(
-        "Выбери расписание для удаления:",
-        reply_markup=keyboard
+    await asyncio.gather(
+        callback.message.edit_text(
+            "Выбери расписание для удаления:",
+            reply_markup=keyboard
+        ),
+        callback.answer(),
     )
-    await callback.answer()
 
 
 @router.callback_query(F.data.startswith("rmschedule_"))
@@ -203,8 +217,10 @@ async def delete_schedule(callback: CallbackQuery):
     schedule_id = int(schedule_id)
     pill_id = int(pill_id)
 
-    pill = await db.get_pill(pill_id)
-    user = await db.get_user(callback.from_user.id, callback.message.chat.id)
+    pill, user = await asyncio.gather(
+        db.get_pill(pill_id),
+        db.get_user(callback.from_user.id, callback.message.chat.id),
+    )
     if not user or not pill or pill.user_id != user.id:
         await callback.answer("Ошибка доступа", show_alert=True)
         return
@@ -214,23 +230,7 @@ async def delete_schedule(callback: CallbackQuery):
 
     # Show updated pill schedule
     schedules = await db.get_pill_schedules(pill_id)
-    text = f"<b>{pill.name}</b> ({pill.dosage})\n\n"
-
-    if schedules:
-        text += "<b>Текущее расписание:</b>\n"
-        for s in schedules:
-            text += f"• {s.time} - {get_days_names(s.days)}\n"
-    else:
-        text += "Расписание не задано.\n"
-
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="Добавить время", callback_data=f"add_schedule_{pill_id}")],
-            [InlineKeyboardButton(text="Удалить расписание", callback_data=f"del_schedule_{pill_id}")] if schedules else [],
-            [InlineKeyboardButton(text="Назад", callback_data="back_to_pills")],
-        ]
-    )
-
+    text, keyboard = build_schedule_message(pill, schedules)
     await callback.message.edit_text(text, reply_markup=keyboard)
 
 
@@ -244,8 +244,10 @@ async def back_to_pills(callback: CallbackQuery):
 
     pills = await db.get_user_pills(user.id)
     if not pills:
-        await callback.message.edit_text("У тебя нет добавленных таблеток.")
-        await callback.answer()
+        await asyncio.gather(
+            callback.message.edit_text("У тебя нет добавленных таблеток."),
+            callback.answer(),
+        )
         return
 
     keyboard = InlineKeyboardMarkup(
@@ -258,8 +260,10 @@ async def back_to_pills(callback: CallbackQuery):
         ]
     )
 
-    await callback.message.edit_text(
-        "Выбери таблетку для управления расписанием:",
-        reply_markup=keyboard
+    await asyncio.gather(
+        callback.message.edit_text(
+            "Выбери таблетку для управления расписанием:",
+            reply_markup=keyboard
+        ),
+        callback.answer(),
     )
-    await callback.answer()
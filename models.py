@@ -1,10 +1,24 @@
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
-import json
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Sequence
 
 
-@dataclass
+# Weekday number (1 = Monday) -> short name; index 0 unused
+DAY_NAMES = ("", "Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+
+# Every weekday; a tuple so sharing it through FSM data and defaults can't mutate it
+ALL_DAYS = (1, 2, 3, 4, 5, 6, 7)
+
+
+def days_to_mask(days: Sequence[int]) -> int:
+    """Pack day numbers into a bitmask (bit N set = day N)."""
+    mask = 0
+    for d in days:
+        mask |= 1 << d
+    return mask
+
+
+@dataclass(slots=True)
 class User:
     id: int
     telegram_id: int
@@ -14,7 +28,7 @@ class User:
     timezone: str = "Europe/Moscow"
 
 
-@dataclass
+@dataclass(slots=True)
 class Pill:
     id: int
     user_id: int
@@ -24,7 +38,7 @@ class Pill:
     notes: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Schedule:
     id: int
     pill_id: int
@@ -36,20 +50,19 @@ class Schedule:
     is_active: bool = True
 
     @property
-    def days_json(self) -> str:
-        return json.dumps(self.days)
+    def days_mask(self) -> int:
+        return days_to_mask(self.days)
 
     @classmethod
-    def days_from_json(cls, json_str: str) -> list[int]:
-        return json.loads(json_str)
+    def days_from_mask(cls, mask: int) -> list[int]:
+        return [d for d in range(32) if mask & (1 << d)]
 
     def get_frequency_display(self) -> str:
         """Human-readable frequency."""
         if self.frequency == "daily":
             return "ежедневно"
         elif self.frequency == "weekly":
-            day_names = {1: "Пн", 2: "Вт", 3: "Ср", 4: "Чт", 5: "Пт", 6: "Сб", 7: "Вс"}
-            days_str = ", ".join(day_names[d] for d in sorted(self.days))
+            days_str = ", ".join(DAY_NAMES[d] for d in sorted(self.days))
             return f"раз в неделю ({days_str})"
         elif self.frequency == "monthly":
             return f"раз в месяц ({self.days[0]} числа)" if self.days else "раз в месяц"
@@ -58,16 +71,43 @@ class Schedule:
                 return "через день"
             return f"каждые {self.interval_days} дн."
         elif self.frequency == "specific_days":
-            day_names = {1: "Пн", 2: "Вт", 3: "Ср", 4: "Чт", 5: "Пт", 6: "Сб", 7: "Вс"}
-            days_str = ", ".join(day_names[d] for d in sorted(self.days))
+            days_str = ", ".join(DAY_NAMES[d] for d in sorted(self.days))
             return days_str
         return "неизвестно"
 
 
-@dataclass
+@dataclass(slots=True)
 class IntakeLog:
     id: int
     schedule_id: int
     scheduled_time: datetime
     taken_at: Optional[datetime] = None
     status: str = "pending"  # pending, taken, missed, reminded
+
+
+@dataclass
+class TickContext:
+    """Date values computed once and shared by every query in a scheduler tick."""
+    now: datetime
+    today: date
+    day_start: int  # unix time of today's midnight
+    day_end: int  # unix time of tomorrow's midnight
+    week_bit: int  # days_mask bit for today's weekday
+    month_bit: int  # days_mask bit for today's day of month
+    julian_day: float  # SQLite julianday() of today's midnight
+
+    @classmethod
+    def at(cls, now: datetime) -> "TickContext":
+        today = now.date()
+        # Each midnight gets its own UTC offset, so DST days come out 23 or 25 hours long
+        day_start = int(datetime.combine(today, time(), tzinfo=now.tzinfo).timestamp())
+        day_end = int(datetime.combine(today + timedelta(days=1), time(), tzinfo=now.tzinfo).timestamp())
+        return cls(
+            now=now,
+            today=today,
+            day_start=day_start,
+            day_end=day_end,
+            week_bit=1 << today.isoweekday(),
+            month_bit=1 << today.day,
+            julian_day=today.toordinal() + 1721424.5,
+        )
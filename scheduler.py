@@ -1,22 +1,31 @@
+import asyncio
 import logging
+from collections import defaultdict
 from datetime import datetime, date
-import pytz
+from html import escape
+from zoneinfo import ZoneInfo
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 import database as db
 from config import TIMEZONE
+from models import TickContext
 
 logger = logging.getLogger(__name__)
 
-TZ = pytz.timezone(TIMEZONE)
+TZ = ZoneInfo(TIMEZONE)
 
 # Morning reminder at 8:00 for pills scheduled 00:00-19:59
 MORNING_HOUR = 8
 # Evening reminder at 20:00 for pills scheduled 20:00-23:59
 EVENING_HOUR = 20
+# Telegram allows about 30 messages per second across different chats
+SEND_BATCH_SIZE = 30
+# A daily reminder that fires late beats one APScheduler drops after its default 1 s grace
+MISFIRE_GRACE_SECONDS = 300
 
 
 def get_now():
@@ -29,7 +38,14 @@ def get_today():
 
 def setup_scheduler(bot: Bot) -> AsyncIOScheduler:
     """Setup scheduler with 2 daily reminders."""
-    scheduler = AsyncIOScheduler(timezone=TIMEZONE)
+    scheduler = AsyncIOScheduler(
+        timezone=TIMEZONE,
+        job_defaults={
+            "coalesce": True,
+            "max_instances": 1,
+            "misfire_grace_time": MISFIRE_GRACE_SECONDS,
+        },
+    )
 
     # Morning reminder at 8:00 Dubai time
     scheduler.add_job(
@@ -55,68 +71,52 @@ def setup_scheduler(bot: Bot) -> AsyncIOScheduler:
 def build_pills_text_and_keyboard(mention: str, pills: list[dict], header: str) -> tuple[str, InlineKeyboardMarkup]:
     """Build grouped message text and keyboard for a list of pills."""
     lines = [f"{mention}, {header}\n"]
+    buttons = []
 
     for p in pills:
         status = p.get("status", "pending")
+        name = p["pill_name"]
+        # Sent with parse_mode=HTML, so user-entered text must not be read as markup
+        pill = f"{escape(name)} ({escape(p['dosage'])})"
         if status == "taken":
-            taken_at = p.get("taken_at", "")
-            time_str = ""
-            if taken_at and isinstance(taken_at, str):
-                try:
-                    t = datetime.fromisoformat(taken_at)
-                    time_str = t.strftime("%H:%M")
-                except:
-                    pass
+            taken_at = p.get("taken_at")
+            time_str = datetime.fromtimestamp(taken_at, TZ).strftime("%H:%M") if taken_at else ""
             suffix = f" — выпито в {time_str}" if time_str else ""
-            lines.append(f"✅ {p['pill_name']} ({p['dosage']}){suffix}")
+            lines.append(f"✅ {pill}{suffix}")
         elif status == "missed":
-            lines.append(f"❌ {p['pill_name']} ({p['dosage']}) — пропущено")
+            lines.append(f"❌ {pill} — пропущено")
         else:
             schedule_time = p.get("time", "")
             time_suffix = f" [{schedule_time}]" if schedule_time else ""
-            lines.append(f"⏳ {p['pill_name']} ({p['dosage']}){time_suffix}")
+            lines.append(f"⏳ {pill}{time_suffix}")
+            if status == "pending":
+                buttons.append([
+                    InlineKeyboardButton(text=f"✅ {name}", callback_data=f"taken_{p['id']}"),
+                    InlineKeyboardButton(text=f"❌ {name}", callback_data=f"missed_{p['id']}"),
+                ])
 
     text = "\n".join(lines)
-
-    buttons = []
-    for p in pills:
-        if p.get("status", "pending") == "pending":
-            buttons.append([
-                InlineKeyboardButton(text=f"✅ {p['pill_name']}", callback_data=f"taken_{p['id']}"),
-                InlineKeyboardButton(text=f"❌ {p['pill_name']}", callback_data=f"missed_{p['id']}"),
-            ])
-
     keyboard = InlineKeyboardMarkup(inline_keyboard=buttons) if buttons else None
     return text, keyboard
 
 
 async def send_grouped_reminder(bot: Bot, time_from: str, time_to: str, header: str):
     """Send one grouped reminder per user for pills in the given time range."""
-    now = get_now()
-    current_date = get_today()
-
-    schedules = await db.get_schedules_for_time_range(time_from, time_to, current_date)
-
-    # Create logs and group by (chat_id, telegram_id)
-    user_pills = {}
-    for schedule in schedules:
-        if await db.check_existing_log(schedule["id"], current_date):
-            continue
-
-        log = await db.create_intake_log(
-            schedule_id=schedule["id"],
-            scheduled_time=now,
-        )
-
-        key = (schedule["chat_id"], schedule["telegram_id"])
-        if key not in user_pills:
-            user_pills[key] = {
-                "chat_id": schedule["chat_id"],
-                "username": schedule["username"],
-                "first_name": schedule["first_name"],
-                "pills": [],
-            }
-        user_pills[key]["pills"].append({
+    ctx = TickContext.at(get_now())
+    now = ctx.now
+
+    # Only schedules without a log today, so a restart doesn't remind twice
+    due = await db.get_schedules_for_time_range(time_from, time_to, ctx)
+
+    logs = await db.create_intake_logs([
+        (schedule["id"], now, schedule["telegram_id"], schedule["chat_id"]) for schedule in due
+    ])
+
+    # Group by user; username and first_name are the same on all of a user's rows
+    user_pills = defaultdict(list)
+    for schedule, log in zip(due, logs):
+        key = (schedule["chat_id"], schedule["telegram_id"], schedule["username"], schedule["first_name"])
+        user_pills[key].append({
             "id": log.id,
             "pill_name": schedule["pill_name"],
             "dosage": schedule["dosage"],
@@ -124,25 +124,44 @@ async def send_grouped_reminder(bot: Bot, time_from: str, time_to: str, header:
             "status": "pending",
         })
 
-    for key, data in user_pills.items():
-        if data["username"]:
-            mention = f"@{data['username']}"
-        else:
-            mention = data["first_name"] or "Друг"
-
-        text, keyboard = build_pills_text_and_keyboard(mention, data["pills"], header)
-
+    # Send each batch concurrently and start at most one batch per second
+    reminders = list(user_pills.items())
+    loop = asyncio.get_running_loop()
+    for start in range(0, len(reminders), SEND_BATCH_SIZE):
+        started_at = loop.time()
+        await asyncio.gather(*(
+            send_user_reminder(bot, user, pills, header)
+            for user, pills in reminders[start:start + SEND_BATCH_SIZE]
+        ))
+        if start + SEND_BATCH_SIZE < len(reminders):
+            await asyncio.sleep(max(0.0, 1.0 - (loop.time() - started_at)))
+
+
+async def send_user_reminder(bot: Bot, user: tuple, pills: list[dict], header: str):
+    """Send one user's grouped reminder, logging instead of raising on failure.
+
+    user: (chat_id, telegram_id, username, first_name)
+    """
+    chat_id, _, username, first_name = user
+    if username:
+        mention = f"@{username}"
+    else:
+        mention = escape(first_name or "Друг")
+
+    text, keyboard = build_pills_text_and_keyboard(mention, pills, header)
+
+    try:
         try:
-            await bot.send_message(
-                chat_id=data["chat_id"],
-                text=text,
-                reply_markup=keyboard,
-                parse_mode="HTML",
-            )
-            pill_names = ", ".join(p["pill_name"] for p in data["pills"])
-            logger.info(f"Sent reminder to chat {data['chat_id']} for {pill_names}")
-        except Exception as e:
-            logger.error(f"Failed to send reminder: {e}")
+            await bot.send_message(chat_id=chat_id, text=text, reply_markup=keyboard, parse_mode="HTML")
+        except TelegramRetryAfter as e:
+            # Flood control: wait as long as Telegram asks, then retry once instead of dropping it
+            logger.warning(f"Flood limit for chat {chat_id}, retrying in {e.retry_after}s")
+            await asyncio.sleep(e.retry_after)
+            await bot.send_message(chat_id=chat_id, text=text, reply_markup=keyboard, parse_mode="HTML")
+        pill_names = ", ".join(p["pill_name"] for p in pills)
+        logger.info(f"Sent reminder to chat {chat_id} for {pill_names}")
+    except Exception as e:
+        logger.error(f"Failed to send reminder: {e}")
 
 
 async def send_morning_reminder(bot: Bot):